@@ -5,11 +5,10 @@ from uuid import uuid4
 import logging
 import json
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured once in app.py
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class LogisticsInsight:
     insight_id: str
     timestamp: str
@@ -20,11 +19,12 @@ class LogisticsInsight:
     recommendations: List[Dict[str, Any]]
 
     @classmethod
-    def create(cls, category: str, observation: str, confidence: float, 
-               impact: Dict[str, Any], recommendations: List[Dict[str, Any]]):
+    def create(cls, category: str, observation: str, confidence: float,
+               impact: Dict[str, Any], recommendations: List[Dict[str, Any]],
+               timestamp: Optional[str] = None):
         return cls(
-            insight_id=str(uuid4()),
-            timestamp=datetime.now().isoformat(),
+            insight_id=uuid4().hex,
+            timestamp=timestamp or datetime.now().isoformat(),
             category=category,
             observation=observation,
             confidence=confidence,
@@ -32,7 +32,7 @@ class LogisticsInsight:
             recommendations=recommendations
         )
 
-@dataclass
+@dataclass(slots=True)
 class LogisticsPlan:
     plan_id: str
     timestamp: str
@@ -40,10 +40,10 @@ class LogisticsPlan:
     details: Dict[str, Any]
 
     @classmethod
-    def create(cls, action: str, details: Dict[str, Any]):
+    def create(cls, action: str, details: Dict[str, Any], timestamp: Optional[str] = None):
         return cls(
-            plan_id=str(uuid4()),
-            timestamp=datetime.now().isoformat(),
+            plan_id=uuid4().hex,
+            timestamp=timestamp or datetime.now().isoformat(),
             action=action,
             details=details
         )
@@ -55,6 +55,9 @@ class LogisticsAgent:
 
     def analyze_logistics_data(self, query: str, data: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         try:
+            # One clock read per request; insights and plans share it
+            now = datetime.now().isoformat()
+
             # Placeholder for logistics analysis logic
             insights = [
                 LogisticsInsight.create(
@@ -62,7 +65,8 @@ class LogisticsAgent:
                     observation="Optimize delivery routes to reduce costs.",
                     confidence=0.85,
                     impact={"cost_savings": 10000},
-                    recommendations=[{"action": "optimize_routes", "priority": "HIGH"}]
+                    recommendations=[{"action": "optimize_routes", "priority": "HIGH"}],
+                    timestamp=now
                 )
             ]
             self.insights.extend(insights)
@@ -70,22 +74,23 @@ class LogisticsAgent:
             plans = [
                 LogisticsPlan.create(
                     action="optimize_routes",
-                    details={"current_routes": ["Route_A", "Route_B"], "proposed_routes": ["Route_C"]}
+                    details={"current_routes": ["Route_A", "Route_B"], "proposed_routes": ["Route_C"]},
+                    timestamp=now
                 )
             ]
             self.plans.extend(plans)
 
+            # Dataclasses are serialized directly by orjson at the response boundary
             return {
-                "insights": [vars(insight) for insight in insights],
-                "plans": [vars(plan) for plan in plans]
+                "insights": insights,
+                "plans": plans
             }
         except Exception as e:
-            logger.error(f"Error in logistics analysis: {str(e)}")
+            logger.error("Error in logistics analysis: %s", e)
             return {"error": str(e)}
 
-    def get_historical_insights(self, category: Optional[str] = None, min_confidence: float = 0.0) -> List[Dict[str, Any]]:
-        filtered_insights = self.insights
-        if category:
-            filtered_insights = [i for i in filtered_insights if i.category == category]
-        filtered_insights = [i for i in filtered_insights if i.confidence >= min_confidence]
-        return [vars(insight) for insight in filtered_insights]
\ No newline at end of file
+    def get_historical_insights(self, category: Optional[str] = None, min_confidence: float = 0.0) -> List[LogisticsInsight]:
+        # Single pass: both filters in one comprehension, no intermediate list
+        return [i for i in self.insights
+                if (category is None or i.category == category)
+                and i.confidence >= min_confidence]
\ No newline at end of file
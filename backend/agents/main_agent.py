@@ -1,17 +1,29 @@
 from dataclasses import dataclass, field
 from typing import List, Dict, Optional, Union, Any
 from enum import Enum
-import json
+import msgspec
+import orjson
 from datetime import datetime
-from groq import Groq
+from collections import deque
+from cachetools import LRUCache
+from groq import AsyncGroq
+import itertools
 import logging
+import secrets
+import threading
 from uuid import uuid4
-from langchain.memory import ConversationBufferWindowMemory
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured once in app.py
 logger = logging.getLogger(__name__)
 
+# Per-process random prefix + atomic counter: unique step IDs without a
+# getrandom() syscall per object on the hot reasoning path
+_ID_PREFIX = secrets.token_hex(8)
+_id_counter = itertools.count()
+
+def _next_step_id() -> str:
+    return f"{_ID_PREFIX}{next(_id_counter):012x}"
+
 class BusinessDomain(Enum):
     SALES = "sales"
     INVENTORY = "inventory"
@@ -30,40 +42,41 @@ class ScenarioType(Enum):
     WHAT_IF_ANALYSIS = "what_if_analysis"
     UNKNOWN = "unknown"
 
-@dataclass
-class WhatIfScenario:
-    scenario_id: str
+# The hot types below are msgspec.Structs rather than dataclasses: C-level
+# __init__, slots built in, and the LLM payload decodes straight into them
+# without a json.loads -> dict -> dataclass roundtrip.
+
+class WhatIfScenario(msgspec.Struct):
     description: str
     assumptions: Dict[str, Any]
     impact_areas: List[str]
     probability: float
-    timestamp: str
+    scenario_id: str = msgspec.field(default_factory=lambda: uuid4().hex)
+    timestamp: str = msgspec.field(default_factory=lambda: datetime.now().isoformat())
 
     @classmethod
-    def create(cls, description: str, assumptions: Dict[str, Any], impact_areas: List[str], probability: float):
+    def create(cls, description: str, assumptions: Dict[str, Any], impact_areas: List[str], probability: float,
+               timestamp: Optional[str] = None):
         return cls(
-            scenario_id=str(uuid4()),
             description=description,
             assumptions=assumptions,
             impact_areas=impact_areas,
             probability=probability,
-            timestamp=datetime.now().isoformat()
+            timestamp=timestamp or datetime.now().isoformat()
         )
 
-@dataclass
-class ActionItem:
-    action_id: str
+class ActionItem(msgspec.Struct):
     description: str
     priority: str
     impact: Dict[str, Any]
     dependencies: List[str]
     timeline: str
     status: str = "pending"
+    action_id: str = msgspec.field(default_factory=lambda: uuid4().hex)
 
     @classmethod
     def create(cls, description: str, priority: str, impact: Dict[str, Any], dependencies: List[str], timeline: str):
         return cls(
-            action_id=str(uuid4()),
             description=description,
             priority=priority,
             impact=impact,
@@ -71,7 +84,7 @@ class ActionItem:
             timeline=timeline
         )
 
-@dataclass
+@dataclass(slots=True)
 class BusinessPlan:
     plan_id: str
     title: str
@@ -81,83 +94,214 @@ class BusinessPlan:
     timeline: str
     what_if_scenarios: List[WhatIfScenario] = field(default_factory=list)
     status: str = "draft"
+    # Markdown memoization. functools.cached_property would need __dict__,
+    # which slots=True removes, so the cache lives in explicit fields keyed
+    # on a version counter; to_public_dict keeps them out of responses.
+    _version: int = field(default=0, repr=False)
+    _md_cache: Optional[str] = field(default=None, repr=False)
+    _md_cache_version: int = field(default=-1, repr=False)
+
+    def add_scenario(self, scenario: WhatIfScenario) -> None:
+        """Append a scenario and invalidate the cached markdown."""
+        self.what_if_scenarios.append(scenario)
+        self._version += 1
+
+    def to_public_dict(self) -> Dict[str, Any]:
+        """Builtin-typed view for response serialization.
+
+        Converts the msgspec.Struct members so orjson can encode the
+        result, and leaves the underscore cache fields out.
+        """
+        return {
+            "plan_id": self.plan_id,
+            "title": self.title,
+            "summary": self.summary,
+            "actions": msgspec.to_builtins(self.actions),
+            "metrics": self.metrics,
+            "timeline": self.timeline,
+            "what_if_scenarios": msgspec.to_builtins(self.what_if_scenarios),
+            "status": self.status,
+        }
 
     def to_markdown(self) -> str:
-        md = f"""# {self.title}
+        # Memoized on the plan version: unchanged plans render once
+        if self._md_cache is not None and self._md_cache_version == self._version:
+            return self._md_cache
+        # Build into a list and join once; repeated += reallocates the whole string
+        parts: List[str] = [f"""# {self.title}
 ## Executive Summary
 {self.summary}
 ## Action Plan
-"""
+"""]
         for action in self.actions:
-            md += f"""### {action.description}
+            parts.append(f"""### {action.description}
 - **Priority:** {action.priority}
 - **Timeline:** {action.timeline}
 - **Status:** {action.status}
 - **Impact:**
-"""
+""")
             for area, impact in action.impact.items():
-                md += f"  - {area}: {impact}\n"
-            md += "\n"
-        md += "## Key Metrics\n"
+                parts.append(f"  - {area}: {impact}\n")
+            parts.append("\n")
+        parts.append("## Key Metrics\n")
         for metric, value in self.metrics.items():
-            md += f"- **{metric}:** {value}\n"
+            parts.append(f"- **{metric}:** {value}\n")
         if self.what_if_scenarios:
-            md += "\n## What-If Analysis\n"
+            parts.append("\n## What-If Analysis\n")
             for scenario in self.what_if_scenarios:
-                md += f"""### Scenario: {scenario.description}
+                parts.append(f"""### Scenario: {scenario.description}
 - **Probability:** {scenario.probability * 100}%
 - **Impact Areas:** {', '.join(scenario.impact_areas)}
 - **Assumptions:**
-"""
+""")
                 for assumption, value in scenario.assumptions.items():
-                    md += f"  - {assumption}: {value}\n"
-                md += "\n"
-        return md
+                    parts.append(f"  - {assumption}: {value}\n")
+                parts.append("\n")
+        self._md_cache = "".join(parts)
+        self._md_cache_version = self._version
+        return self._md_cache
 
-@dataclass
-class ReasoningStep:
-    step_id: str
+class ReasoningStep(msgspec.Struct):
     observation: str
     thought: str
-    action: Optional[str]
-    result: Optional[str]
-    timestamp: str
+    action: Optional[str] = None
+    result: Optional[str] = None
+    step_id: str = msgspec.field(default_factory=_next_step_id)
+    timestamp: str = msgspec.field(default_factory=lambda: datetime.now().isoformat())
 
     @classmethod
-    def create(cls, observation: str, thought: str, action: Optional[str] = None, result: Optional[str] = None):
+    def create(cls, observation: str, thought: str, action: Optional[str] = None, result: Optional[str] = None,
+               timestamp: Optional[str] = None):
         return cls(
-            step_id=str(uuid4()),
             observation=observation,
             thought=thought,
             action=action,
             result=result,
-            timestamp=datetime.now().isoformat()
+            timestamp=timestamp or datetime.now().isoformat()
         )
 
+class PlanData(msgspec.Struct):
+    """business_plan section of the LLM payload."""
+    title: str
+    summary: str
+    actions: List[ActionItem]
+    metrics: Dict[str, Any]
+    what_if_scenarios: List[WhatIfScenario] = msgspec.field(default_factory=list)
+
+class LLMResponse(msgspec.Struct):
+    """Top-level schema of the model's JSON output."""
+    reasoning_chain: List[ReasoningStep]
+    business_plan: PlanData
+
+# One C pass: parse and typed construction of the whole LLM payload
+_LLM_DECODER = msgspec.json.Decoder(LLMResponse)
+
 class ReActChain:
     def __init__(self):
         self.steps: List[ReasoningStep] = []
         self.start_time = datetime.now().isoformat()
         self.context = {}
+        self._cached_json: Optional[bytes] = None
+
+    def add_step(self, observation: str, thought: str, action: Optional[str] = None, result: Optional[str] = None,
+                 timestamp: Optional[str] = None):
+        return self.append_step(ReasoningStep.create(observation, thought, action, result, timestamp))
 
-    def add_step(self, observation: str, thought: str, action: Optional[str] = None, result: Optional[str] = None):
-        step = ReasoningStep.create(observation, thought, action, result)
+    def append_step(self, step: ReasoningStep) -> str:
         self.steps.append(step)
+        self._cached_json = None
         return step.step_id
 
     def to_dict(self) -> Dict:
         return {
             "start_time": self.start_time,
-            "steps": [vars(step) for step in self.steps],
+            "steps": msgspec.to_builtins(self.steps),
             "context": self.context
         }
 
+    def to_json_bytes(self) -> bytes:
+        # Memoized: continue_reasoning re-serializes the same growing chain
+        # on every turn, so only re-encode after add_step invalidates
+        if self._cached_json is None:
+            self._cached_json = orjson.dumps(self.to_dict())
+        return self._cached_json
+
+class _StreamingStepParser:
+    """Incrementally pulls completed reasoning-step objects out of the
+    partial JSON a streamed completion has produced so far.
+
+    Tracks brace depth and string state across feed() calls, so a step can
+    be emitted the moment its closing brace arrives instead of waiting for
+    the full response.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._obj_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        self.buffer += chunk
+        steps: List[Dict] = []
+        if self._done:
+            return steps
+        if not self._in_array:
+            bracket = -1
+            start = self.buffer.find('"reasoning_chain"')
+            if start != -1:
+                bracket = self.buffer.find('[', start)
+            if bracket == -1:
+                return steps
+            self._in_array = True
+            self._pos = bracket + 1
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == '\\':
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch == '{':
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start is not None:
+                    steps.append(orjson.loads(buf[self._obj_start:i + 1]))
+                    self._obj_start = None
+            elif ch == ']' and self._depth == 0:
+                self._done = True
+                break
+            i += 1
+        self._pos = i
+        return steps
+
 class MainAgent:
     def __init__(self, api_key: str):
-        self.llm_client = Groq(api_key=api_key)
-        self.reasoning_chains: Dict[str, ReActChain] = {}
-        self.active_plans: Dict[str, BusinessPlan] = {}
-        self.memory = ConversationBufferWindowMemory(return_messages=True, k=10)  # Added LangChain memory
+        self.llm_client = AsyncGroq(api_key=api_key)
+        # LRU-bounded so resident memory stops growing with the total number
+        # of conversations ever seen; the lock keeps insertions safe when
+        # gunicorn worker threads share this agent
+        self.reasoning_chains: LRUCache = LRUCache(maxsize=10_000)
+        self.active_plans: LRUCache = LRUCache(maxsize=10_000)
+        self._state_lock = threading.Lock()
+        # Windowed conversation memory: plain {role, content} dicts in the
+        # shape the Groq client expects, no LangChain BaseMessage wrapping.
+        # Same LRU bound as the chains and plans, so a conversation's whole
+        # state ages out together instead of its transcript living forever
+        self.memory: LRUCache = LRUCache(maxsize=10_000)
         self.system_prompt = """You are an intelligent business planning agent using the ReAct (Reasoning+Acting) pattern.
 For each query:
 1. Observe: Analyze the current situation
@@ -198,126 +342,192 @@ Format your response as:
         ]
     }
 }"""
-
-    def process_query(self, query: str, conversation_id: Optional[str] = None, continue_reasoning: bool = False) -> Dict:
+        # Built once; reused as the first message of every request instead of
+        # allocating a fresh system dict per call
+        self._sys_msg = {"role": "system", "content": self.system_prompt}
+
+    def _memory_for(self, conversation_id: str) -> deque:
+        """Get or create the bounded message window for a conversation."""
+        with self._state_lock:
+            memory = self.memory.get(conversation_id)
+            if memory is None:
+                memory = deque(maxlen=20)
+                self.memory[conversation_id] = memory
+            return memory
+
+    async def process_query(self, query: str, conversation_id: Optional[str] = None, continue_reasoning: bool = False) -> Dict:
         if not conversation_id:
-            conversation_id = str(uuid4())
+            conversation_id = uuid4().hex
 
         try:
-            if conversation_id not in self.reasoning_chains:
-                self.reasoning_chains[conversation_id] = ReActChain()
-
-            # Add query to memory
-            self.memory.chat_memory.add_message({"role": "user", "content": query})
+            with self._state_lock:
+                if conversation_id not in self.reasoning_chains:
+                    self.reasoning_chains[conversation_id] = ReActChain()
 
             context_prompt = query
             if continue_reasoning:
-                previous_steps = self.reasoning_chains[conversation_id].to_dict()
-                context_prompt = f"""Previous reasoning steps: {json.dumps(previous_steps)}
+                previous_steps = self.reasoning_chains[conversation_id].to_json_bytes()
+                context_prompt = f"""Previous reasoning steps: {previous_steps.decode()}
 New query: {query}
 Continue the reasoning process and update the business plan accordingly."""
 
-            # Include memory in the context prompt
-            memory_messages = [
-                {"role": msg["role"], "content": msg["content"]} for msg in self.memory.load_memory_variables({})["history"]
-            ]
-            messages = [{"role": "system", "content": self.system_prompt}] + memory_messages + [{"role": "user", "content": context_prompt}]
+            # Memory already holds Groq-shaped dicts; splice them in, then
+            # record the query afterwards so the prompt is sent exactly once
+            memory = self._memory_for(conversation_id)
+            messages = [self._sys_msg, *memory, {"role": "user", "content": context_prompt}]
+            memory.append({"role": "user", "content": query})
 
-            response = self.llm_client.chat.completions.create(
+            response = await self.llm_client.chat.completions.create(
                 messages=messages,
                 model="llama3-8b-8192",
                 temperature=0.7
             )
-            result = json.loads(response.choices[0].message.content)
-
-            # Update reasoning chain
-            for step in result["reasoning_chain"]:
-                self.reasoning_chains[conversation_id].add_step(
-                    step["observation"],
-                    step["thought"],
-                    step.get("action"),
-                    step.get("result")
-                )
-
-            # Create or update business plan
-            plan_data = result["business_plan"]
-            plan = BusinessPlan(
-                plan_id=str(uuid4()) if conversation_id not in self.active_plans else self.active_plans[conversation_id].plan_id,
-                title=plan_data["title"],
-                summary=plan_data["summary"],
-                actions=[ActionItem.create(**action) for action in plan_data["actions"]],
-                metrics=plan_data["metrics"],
-                timeline=datetime.now().isoformat(),
-                what_if_scenarios=[WhatIfScenario.create(**scenario) for scenario in plan_data.get("what_if_scenarios", [])]
-            )
-            self.active_plans[conversation_id] = plan
-
-            # Add AI response to memory
-            self.memory.chat_memory.add_message({"role": "assistant", "content": json.dumps(result)})
-
-            return {
-                "conversation_id": conversation_id,
-                "reasoning_chain": self.reasoning_chains[conversation_id].to_dict(),
-                "plan_markdown": plan.to_markdown(),
-                "raw_plan": vars(plan)
-            }
+            content = response.choices[0].message.content
+            return self._apply_result(conversation_id, _LLM_DECODER.decode(content), content)
 
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
+            logger.error("Error processing query: %s", e)
             return {
                 "conversation_id": conversation_id,
                 "error": str(e),
                 "reasoning_chain": self.reasoning_chains.get(conversation_id, ReActChain()).to_dict()
             }
 
-    def what_if_analysis(self, conversation_id: str, scenario_description: str, assumptions: Dict[str, Any]) -> Dict:
+    def _apply_result(self, conversation_id: str, decoded: LLMResponse, content: str) -> Dict:
+        """Fold a decoded LLM result into the conversation state and build the response."""
+        # One clock read per request; every object created below shares it
+        now = datetime.now().isoformat()
+
+        # Update reasoning chain; steps arrive fully typed from the decoder
+        chain = self.reasoning_chains[conversation_id]
+        for step in decoded.reasoning_chain:
+            step.timestamp = now
+            chain.append_step(step)
+
+        # Create or update business plan; one .get() instead of an `in`
+        # probe followed by indexing
+        plan_data = decoded.business_plan
+        for scenario in plan_data.what_if_scenarios:
+            scenario.timestamp = now
+        existing = self.active_plans.get(conversation_id)
+        plan = BusinessPlan(
+            plan_id=existing.plan_id if existing is not None else uuid4().hex,
+            title=plan_data.title,
+            summary=plan_data.summary,
+            actions=plan_data.actions,
+            metrics=plan_data.metrics,
+            timeline=now,
+            what_if_scenarios=plan_data.what_if_scenarios
+        )
+        with self._state_lock:
+            self.active_plans[conversation_id] = plan
+
+        # Add AI response to memory; the model's own JSON is already the
+        # serialized form, no re-encode needed
+        self._memory_for(conversation_id).append({"role": "assistant", "content": content})
+
+        return {
+            "conversation_id": conversation_id,
+            "reasoning_chain": chain.to_dict(),
+            "plan_markdown": plan.to_markdown(),
+            "raw_plan": plan.to_public_dict()
+        }
+
+    async def process_query_stream(self, query: str, conversation_id: Optional[str] = None):
+        """Stream reasoning steps as NDJSON while the model generates.
+
+        Yields one {"type": "step", ...} line per completed reasoning step
+        as its closing brace arrives, then a {"type": "final", ...} line
+        carrying the same payload process_query would have returned.
+        """
+        if not conversation_id:
+            conversation_id = uuid4().hex
+
+        try:
+            with self._state_lock:
+                if conversation_id not in self.reasoning_chains:
+                    self.reasoning_chains[conversation_id] = ReActChain()
+
+            # Splice memory first, then record the query, so it is sent
+            # exactly once
+            memory = self._memory_for(conversation_id)
+            messages = [self._sys_msg, *memory, {"role": "user", "content": query}]
+            memory.append({"role": "user", "content": query})
+
+            stream = await self.llm_client.chat.completions.create(
+                messages=messages,
+                model="llama3-8b-8192",
+                temperature=0.7,
+                stream=True
+            )
+
+            parser = _StreamingStepParser()
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                for step in parser.feed(delta):
+                    yield orjson.dumps({"type": "step", "step": step}) + b"\n"
+
+            yield orjson.dumps({
+                "type": "final",
+                "response": self._apply_result(conversation_id, _LLM_DECODER.decode(parser.buffer), parser.buffer)
+            }) + b"\n"
+
+        except Exception as e:
+            logger.error("Error processing streamed query: %s", e)
+            yield orjson.dumps({"type": "error", "conversation_id": conversation_id, "error": str(e)}) + b"\n"
+
+    async def what_if_analysis(self, conversation_id: str, scenario_description: str, assumptions: Dict[str, Any]) -> Dict:
         try:
             if conversation_id not in self.active_plans:
                 raise ValueError("No active plan found for this conversation")
 
             prompt = f"""Analyze this what-if scenario for the existing plan:
 Scenario: {scenario_description}
-Assumptions: {json.dumps(assumptions)}
+Assumptions: {orjson.dumps(assumptions).decode()}
 Current plan: {self.active_plans[conversation_id].to_markdown()}
 Analyze the implications and suggest plan adjustments."""
 
-            # Add what-if query to memory
-            self.memory.chat_memory.add_message({"role": "user", "content": prompt})
+            # Splice memory first, then record the prompt, so this heavy
+            # message (it embeds the rendered plan) is sent exactly once
+            memory = self._memory_for(conversation_id)
+            messages = [self._sys_msg, *memory, {"role": "user", "content": prompt}]
+            memory.append({"role": "user", "content": prompt})
 
-            response = self.llm_client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await self.llm_client.chat.completions.create(
+                messages=messages,
                 model="llama3-8b-8192",
                 temperature=0.7
             )
-            result = json.loads(response.choices[0].message.content)
+            content = response.choices[0].message.content
+            decoded = _LLM_DECODER.decode(content)
+
+            # One clock read per request; every object created below shares it
+            now = datetime.now().isoformat()
 
-            # Update plan with new scenario
+            # Update plan with new scenarios; they arrive fully typed
             plan = self.active_plans[conversation_id]
-            for scenario in result["business_plan"].get("what_if_scenarios", []):
-                plan.what_if_scenarios.append(WhatIfScenario.create(**scenario))
+            for scenario in decoded.business_plan.what_if_scenarios:
+                scenario.timestamp = now
+                plan.add_scenario(scenario)
 
             # Update reasoning chain
-            for step in result["reasoning_chain"]:
-                self.reasoning_chains[conversation_id].add_step(
-                    step["observation"],
-                    step["thought"],
-                    step.get("action"),
-                    step.get("result")
-                )
+            chain = self.reasoning_chains[conversation_id]
+            for step in decoded.reasoning_chain:
+                step.timestamp = now
+                chain.append_step(step)
 
             # Add AI response to memory
-            self.memory.chat_memory.add_message({"role": "assistant", "content": json.dumps(result)})
+            memory.append({"role": "assistant", "content": content})
 
             return {
                 "conversation_id": conversation_id,
-                "reasoning_chain": self.reasoning_chains[conversation_id].to_dict(),
+                "reasoning_chain": chain.to_dict(),
                 "plan_markdown": plan.to_markdown(),
-                "raw_plan": vars(plan)
+                "raw_plan": plan.to_public_dict()
             }
 
         except Exception as e:
-            logger.error(f"Error in what-if analysis: {str(e)}")
+            logger.error("Error in what-if analysis: %s", e)
             return {"error": str(e)}
\ No newline at end of file
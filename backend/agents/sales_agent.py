@@ -5,8 +5,22 @@ import numpy as np
 class SalesAgent:
     def __init__(self):
         """Initialize SalesAgent and load model."""
-        self.model = self.load_model("Igbmr_model.pkl")
-    
+        # Prefer the ONNX export (convert offline with onnxmltools): one C
+        # call per prediction against a pre-allocated buffer, much faster
+        # than the pickled sklearn/LightGBM predict for single rows.
+        self.session = self.load_onnx_session("Igbmr.onnx")
+        self._input_buf = np.zeros((1, 2), dtype=np.float32)
+        self.model = None if self.session else self.load_model("Igbmr_model.pkl")
+
+    def load_onnx_session(self, model_path):
+        """Load the ONNX-exported forecasting model if available."""
+        try:
+            import onnxruntime
+            return onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        except Exception as e:
+            print(f"ONNX model unavailable, falling back to pickle: {e}")
+            return None
+
     def load_model(self, model_path):
         """Load a sales forecasting model."""
         try:
@@ -27,11 +41,25 @@ class SalesAgent:
         else:
             return "Sales Agent received the request but needs more details."
 
-    def generate_forecast(self):
-        """Generate a sales forecast using the loaded model."""
-        if self.model:
-            # Example input; you can replace it with dynamic input
-            forecast_result = self.model.predict([[2024, 7]])  # Example for July 2024
-            return f"Sales forecast for next month: {forecast_result}"
+    def generate_forecast(self, months=None):
+        """Generate sales forecasts for one or more (year, month) pairs.
+
+        All horizons go through a single batched predict call; calling the
+        model once per month pays the Python-to-C crossing N times.
+        """
+        if months is None:
+            months = [(2024, 7)]  # Example for July 2024
+        if self.session:
+            if len(months) == 1:
+                # Reuse the pre-allocated buffer for the common single-month case
+                self._input_buf[0] = months[0]
+                features = self._input_buf
+            else:
+                features = np.asarray(months, dtype=np.float32)
+            forecast_result = self.session.run(None, {"input": features})[0]
+            return f"Sales forecast: {forecast_result}"
+        elif self.model:
+            forecast_result = self.model.predict(np.asarray(months, dtype=np.float32))
+            return f"Sales forecast: {forecast_result}"
         else:
             return "Sales forecasting model not available."
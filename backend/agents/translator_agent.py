@@ -1,8 +1,7 @@
 from typing import Dict, Any
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured once in app.py
 logger = logging.getLogger(__name__)
 
 class TranslatorAgent:
@@ -19,5 +18,5 @@ class TranslatorAgent:
             }
             return translated_message
         except Exception as e:
-            logger.error(f"Error in message translation: {str(e)}")
+            logger.error("Error in message translation: %s", e)
             return {"error": str(e)}
\ No newline at end of file
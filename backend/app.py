@@ -1,11 +1,13 @@
 import os
 import logging
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, field_validator
 from dotenv import load_dotenv
 from agents.main_agent import MainAgent
 from datetime import datetime
-from typing import Dict, Any
 import traceback
 
 # Configure logging
@@ -22,115 +24,128 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is not set")
 
+class ChatRequest(BaseModel):
+    """Chat request body; replaces the hand-rolled request validation."""
+    message: str
+
+    @field_validator('message')
+    @classmethod
+    def message_not_empty(cls, value: str) -> str:
+        if not value.strip():
+            raise ValueError('Message cannot be empty')
+        return value
+
 class IBPApplication:
     def __init__(self):
-        """Initialize the IBP application with Flask and MainAgent."""
-        self.app = Flask(__name__)
-        CORS(self.app)  # Enable CORS for all routes
+        """Initialize the IBP application with FastAPI and MainAgent."""
+        self.app = FastAPI(title="ProdAI Inference Backend", default_response_class=ORJSONResponse)
+        self.app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
         self.main_agent = MainAgent(api_key=GROQ_API_KEY)
         self._setup_routes()
         self.session_data = {}
 
     def _setup_routes(self) -> None:
-        """Set up Flask routes."""
-        self.app.route('/chat', methods=['POST'])(self.handle_chat)
-        self.app.route('/health', methods=['GET'])(self.health_check)
-        
+        """Set up FastAPI routes."""
+        self.app.post('/chat')(self.handle_chat)
+        self.app.post('/chat/stream')(self.handle_chat_stream)
+        self.app.get('/health')(self.health_check)
+
         # Error handlers
-        self.app.errorhandler(400)(self.bad_request_error)
-        self.app.errorhandler(500)(self.internal_server_error)
-
-    def _validate_chat_request(self, data: Dict[str, Any]) -> tuple[bool, str]:
-        """Validate the chat request data."""
-        if not data:
-            return False, "No data provided"
-        if 'message' not in data:
-            return False, "No message field in request"
-        if not isinstance(data['message'], str):
-            return False, "Message must be a string"
-        if not data['message'].strip():
-            return False, "Message cannot be empty"
-        return True, ""
-
-    def handle_chat(self):
+        self.app.exception_handler(RequestValidationError)(self.bad_request_error)
+        self.app.exception_handler(Exception)(self.internal_server_error)
+
+    async def handle_chat(self, body: ChatRequest):
         """Handle incoming chat requests."""
         try:
-            # Get request data
-            data = request.get_json()
-            
-            # Validate request
-            is_valid, error_message = self._validate_chat_request(data)
-            if not is_valid:
-                return jsonify({
-                    "error": error_message,
-                    "status": "error"
-                }), 400
-
             # Log incoming request
-            logger.info(f"Received chat request: {data['message'][:100]}...")
+            logger.info("Received chat request: %.100s...", body.message)
 
-            # Process message through MainAgent
+            # Process message through MainAgent; awaiting the async Groq call
+            # lets one worker keep many LLM requests in flight
             start_time = datetime.now()
-            response = self.main_agent.process_query(data['message'])
+            response = await self.main_agent.process_query(body.message)
             processing_time = (datetime.now() - start_time).total_seconds()
 
             # Log processing time
-            logger.info(f"Request processed in {processing_time:.2f} seconds")
+            logger.info("Request processed in %.2f seconds", processing_time)
 
-            # Prepare response
-            return jsonify({
+            # Returned directly as ORJSONResponse so dataclasses in the
+            # payload are serialized by orjson, not jsonable_encoder
+            return ORJSONResponse({
                 "response": response,
                 "status": "success",
                 "processing_time": processing_time
             })
 
         except Exception as e:
-            logger.error(f"Error processing chat request: {str(e)}")
+            logger.error("Error processing chat request: %s", e)
             logger.error(traceback.format_exc())
-            return jsonify({
+            return ORJSONResponse({
                 "error": "An error occurred processing your request",
                 "status": "error",
-                "details": str(e) if self.app.debug else "Internal server error"
-            }), 500
-
-    def health_check(self):
+                "details": "Internal server error"
+            }, status_code=500)
+
+    async def handle_chat_stream(self, body: ChatRequest):
+        """Stream reasoning steps to the client as NDJSON.
+
+        Time-to-first-byte drops to first-token latency instead of waiting
+        for the whole reasoning chain to finish server-side.
+        """
+        logger.info("Received streaming chat request: %.100s...", body.message)
+        return StreamingResponse(
+            self.main_agent.process_query_stream(body.message),
+            media_type="application/x-ndjson"
+        )
+
+    async def health_check(self):
         """Health check endpoint."""
-        return jsonify({
+        return {
             "status": "healthy",
             "timestamp": datetime.now().isoformat(),
             "version": "1.0.0"
-        })
+        }
 
     @staticmethod
-    def bad_request_error(error):
-        """Handle 400 Bad Request errors."""
-        return jsonify({
+    async def bad_request_error(request: Request, exc: RequestValidationError):
+        """Handle invalid request bodies."""
+        return ORJSONResponse({
             "error": "Bad Request",
-            "message": str(error),
+            "message": str(exc),
             "status": "error"
-        }), 400
+        }, status_code=400)
 
     @staticmethod
-    def internal_server_error(error):
-        """Handle 500 Internal Server Error."""
-        logger.error(f"Internal Server Error: {str(error)}")
+    async def internal_server_error(request: Request, exc: Exception):
+        """Handle unexpected server errors."""
+        logger.error("Internal Server Error: %s", exc)
         logger.error(traceback.format_exc())
-        return jsonify({
+        return ORJSONResponse({
             "error": "Internal Server Error",
             "message": "An unexpected error occurred",
             "status": "error"
-        }), 500
+        }, status_code=500)
 
-    def run(self, host='0.0.0.0', port=5000, debug=False):
-        """Run the Flask application."""
-        logger.info(f"Starting IBP application on port {port}")
-        self.app.run(host=host, port=port, debug=debug)
+    def run(self, host='0.0.0.0', port=5000):
+        """Run the application with uvicorn."""
+        import uvicorn
+        logger.info("Starting IBP application on port %s", port)
+        uvicorn.run(self.app, host=host, port=port)
 
 # Application entry point
 def create_app() -> IBPApplication:
     """Create and configure the IBP application."""
     return IBPApplication()
 
+# ASGI entry point so the app runs under uvicorn with multiple workers
+# (see Procfile).
+ibp_app = create_app()
+app = ibp_app.app
+
 if __name__ == '__main__':
-    ibp_app = create_app()
-    ibp_app.run(debug=True)
\ No newline at end of file
+    ibp_app.run()
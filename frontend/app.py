@@ -1,179 +1,392 @@
 import streamlit as st
-import networkx as nx
-from pyvis.network import Network
+import os
+import hashlib
+import httpx
 import json
-import requests
-
-def create_reasoning_graph(reasoning_data):
-    """Create graph from reasoning chain data"""
-    steps = reasoning_data.get("steps", [])
-    
-    if not steps:
-        st.error("No reasoning steps available.")
+import orjson
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Identical queries within a session are served from this many cached
+# responses instead of re-hitting the backend
+_QUERY_CACHE_SIZE = 32
+
+# pyvis (and jinja2 behind it) are only imported once a graph is
+# actually built, so cold start and error-path reruns skip the whole
+# import chain
+@lru_cache(maxsize=1)
+def _pyvis_template_env():
+    """Shared Jinja environment for pyvis, built on first graph render.
+
+    Every Network() builds its own environment, which re-reads and
+    recompiles the template per graph. Reusing one environment lets
+    Jinja's template cache serve every build after the first.
+    """
+    import pyvis.network
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(
+        loader=FileSystemLoader(os.path.join(os.path.dirname(pyvis.network.__file__), "templates"))
+    )
+
+# Module-level client so keepalive connections persist across Streamlit
+# reruns. Plain HTTP/1.1: httpx only negotiates h2 over TLS ALPN and the
+# backend serves cleartext uvicorn, so http2=True would just add an
+# optional h2 dependency without ever being used
+_HTTPX = httpx.Client(
+    timeout=httpx.Timeout(120.0, connect=3.0),
+    limits=httpx.Limits(max_keepalive_connections=4),
+    headers={'Content-Type': 'application/json'},
+)
+
+# Chains up to this many steps get a fixed layered layout with physics
+# off; force-directed stabilization is overkill for a handful of nodes
+# and makes the layout jitter between reruns
+_STATIC_LAYOUT_MAX_STEPS = 10
+
+# Column x-positions for the static layout, one per node type
+_STATIC_COLUMNS = {"obs": 0, "thought": 250, "action": 500, "result": 750}
+_STATIC_ROW_HEIGHT = 160
+
+# Built once; pyvis re-parses this string on every set_options call, so at
+# least avoid re-allocating it per graph build
+_PYVIS_OPTIONS_STATIC = """
+var options = {
+    "physics": {"enabled": false}
+}
+"""
+
+# Stabilization iterations are filled in per graph: big chains get more
+# iterations, but nowhere near the flat 150 the old options hardcoded
+_PYVIS_OPTIONS_PHYSICS = """
+var options = {
+    "physics": {
+        "forceAtlas2Based": {
+            "gravitationalConstant": -50,
+            "centralGravity": 0.01,
+            "springLength": 200,
+            "springConstant": 0.08
+        },
+        "maxVelocity": 50,
+        "solver": "forceAtlas2Based",
+        "timestep": 0.35,
+        "stabilization": {"iterations": %d}
+    }
+}
+"""
+
+@st.cache_data(show_spinner=False)
+def build_graph_html(steps_tuple):
+    """Build the pyvis graph HTML for a reasoning chain.
+
+    Keyed on a hashable tuple of step tuples so Streamlit reruns reuse the
+    cached HTML instead of rebuilding the graph on every widget
+    interaction.
+    """
+    steps = [
+        {"step_id": sid, "observation": obs, "thought": thought, "action": action, "result": result}
+        for sid, obs, thought, action, result in steps_tuple
+    ]
+    # A one-step chain has nothing to connect; the detailed-steps
+    # markdown says everything the graph would, without the pyvis render
+    if len(steps) < 2:
         return None
+    net = create_network_visualization(steps)
+    # In-memory render: no disk round-trip, and no shared filename for
+    # concurrent sessions to clobber
+    return net.generate_html(notebook=False)
 
-    G = nx.DiGraph()
-    
-    for step in steps:
-        obs_id = f"Obs_{step['step_id']}"
-        G.add_node(obs_id, 
-                   title=step['observation'],
-                   label="Observation",
-                   color='#90CAF9',  # Light blue
-                   size=25)
-        
-        thought_id = f"Think_{step['step_id']}"
-        G.add_node(thought_id, 
-                   title=step['thought'],
-                   label="Thought",
-                   color='#A5D6A7',  # Light green
-                   size=25)
-        
-        G.add_edge(obs_id, thought_id, 
-                   color='#90A4AE',  # Gray
-                   arrows='to')
-        
-        if step.get('action'):
-            action_id = f"Act_{step['step_id']}"
-            G.add_node(action_id, 
-                       title=step['action'],
-                       label="Action",
-                       color='#FFCC80',  # Light orange
-                       size=25)
-            G.add_edge(thought_id, action_id, 
-                       color='#90A4AE',
-                       arrows='to')
-            
-            if step.get('result'):
-                result_id = f"Result_{step['step_id']}"
-                G.add_node(result_id, 
-                           title=step['result'],
-                           label="Result",
-                           color='#EF9A9A',  # Light red
-                           size=25)
-                G.add_edge(action_id, result_id, 
-                           color='#90A4AE',
-                           arrows='to')
-
-    return G
+def store_response(response):
+    """Stash a backend response in session state for rendering.
+
+    The raw plan is serialized here, once per response, so the expander
+    and reruns render a prebuilt string instead of re-serializing the
+    nested dict every time.
+    """
+    st.session_state.response_data = response
+    st.session_state.raw_plan_str = orjson.dumps(
+        response.get("raw_plan") or {}, option=orjson.OPT_INDENT_2
+    ).decode()
+    st.session_state.has_response = True
+    st.session_state.batch_results = None
+
+def store_batch_responses(queries, responses):
+    """Stash the results of a multi-query batch for tabbed rendering.
+
+    Returns the (query, error) pairs for failed entries so the caller
+    can surface them; a partial batch should not silently drop tabs.
+    """
+    results, failures = [], []
+    for query, data in zip(queries, responses):
+        if data and data.get("response"):
+            response = data["response"]
+            results.append({
+                "query": query,
+                "response": response,
+                "raw_plan_str": orjson.dumps(
+                    response.get("raw_plan") or {}, option=orjson.OPT_INDENT_2
+                ).decode(),
+            })
+        else:
+            failures.append((query, (data or {}).get("error", "no response")))
+    st.session_state.batch_results = results
+    st.session_state.has_response = False
+    return failures
+
+def steps_cache_key(steps):
+    """Hashable view of the reasoning steps for the cache key."""
+    return tuple(
+        (s['step_id'], s['observation'], s['thought'], s.get('action'), s.get('result'))
+        for s in steps
+    )
 
 def fetch_data_from_flask(message):
-    """Fetch data from Flask backend"""
+    """Fetch data from the backend over the pooled client.
+
+    Returns {"error": ...} on failure instead of calling st.error: this
+    runs on batch worker threads, which have no ScriptRunContext, so
+    Streamlit would silently drop any element created here. The main
+    script thread surfaces the errors.
+    """
     url = "http://127.0.0.1:5000/chat"
-    payload = json.dumps({"message": message})
-    headers = {'Content-Type': 'application/json'}
 
     try:
-        response = requests.post(url, data=payload, headers=headers)
+        # orjson bytes go straight on the wire; the json= kwarg would
+        # re-serialize through stdlib json (Content-Type is already set
+        # on the client)
+        response = _HTTPX.post(url, content=orjson.dumps({"message": message}))
         response.raise_for_status()
         return response.json()
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
+        return {"error": str(e)}
+
+def stream_data_from_backend(message, status):
+    """Stream the backend's NDJSON response, surfacing steps as they land.
+
+    The one-shot /chat call blocks until the whole reasoning chain is
+    done; here each completed step is written into the status box as it
+    arrives, so perceived latency is time-to-first-step.
+    """
+    url = "http://127.0.0.1:5000/chat/stream"
+
+    try:
+        with _HTTPX.stream("POST", url, content=orjson.dumps({"message": message}),
+                           timeout=httpx.Timeout(300.0, connect=3.0)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("type") == "step":
+                    step = event["step"]
+                    status.write(f"**Thought:** {step.get('thought', '')}")
+                elif event.get("type") == "final":
+                    return event["response"]
+                elif event.get("type") == "error":
+                    st.error(f"Backend error: {event.get('error', 'unknown')}")
+                    return None
+        return None
+    except httpx.HTTPError as e:
         st.error(f"Error fetching data from backend: {str(e)}")
         return None
 
-def create_network_visualization(G):
-    """Create and configure network visualization"""
-    net = Network(height="600px", width="100%", directed=True, bgcolor='#ffffff', font_color='#000000')
-    
-    for node, node_attrs in G.nodes(data=True):
-        net.add_node(node,
-                     title=node_attrs.get('title', ''),
-                     label=node_attrs.get('label', ''),
-                     color=node_attrs.get('color', '#97C2FC'),
-                     size=node_attrs.get('size', 25))
-    
-    for edge in G.edges(data=True):
-        net.add_edge(edge[0], edge[1],
-                     color=edge[2].get('color', '#97C2FC'),
-                     arrows=edge[2].get('arrows', 'to'))
-    
-    net.set_options("""
-    var options = {
-        "physics": {
-            "forceAtlas2Based": {
-                "gravitationalConstant": -50,
-                "centralGravity": 0.01,
-                "springLength": 200,
-                "springConstant": 0.08
-            },
-            "maxVelocity": 50,
-            "solver": "forceAtlas2Based",
-            "timestep": 0.35,
-            "stabilization": {"iterations": 150}
-        }
-    }
-    """)
-    
+def create_network_visualization(steps):
+    """Build the network visualization directly from reasoning steps.
+
+    Appends straight into the pyvis Network; the old nx.DiGraph
+    intermediate was never used for graph algorithms and just meant every
+    node and edge was built twice.
+    """
+    from pyvis.network import Network
+
+    # cdn_resources="remote" references the vis.js bundle from the CDN
+    # instead of inlining ~100 kB of library into every graph HTML, so
+    # reruns only ship the node/edge data and the browser cache serves
+    # the library
+    net = Network(height="600px", width="100%", directed=True, bgcolor='#ffffff',
+                  font_color='#000000', cdn_resources="remote")
+    net.templateEnv = _pyvis_template_env()
+
+    static_layout = len(steps) <= _STATIC_LAYOUT_MAX_STEPS
+
+    def _pos(column, row):
+        """Node position kwargs: fixed coordinates for small static graphs."""
+        if not static_layout:
+            return {}
+        return {"x": _STATIC_COLUMNS[column], "y": row * _STATIC_ROW_HEIGHT}
+
+    for row, step in enumerate(steps):
+        # Bind each field once per step instead of re-hashing the dict
+        # for every node and edge below
+        sid = step['step_id']
+        observation = step['observation']
+        thought = step['thought']
+        action = step.get('action')
+        result = step.get('result') if action else None
+
+        obs_id = f"Obs_{sid}"
+        net.add_node(obs_id,
+                     title=observation,
+                     label="Observation",
+                     color='#90CAF9',  # Light blue
+                     size=25,
+                     **_pos("obs", row))
+
+        thought_id = f"Think_{sid}"
+        net.add_node(thought_id,
+                     title=thought,
+                     label="Thought",
+                     color='#A5D6A7',  # Light green
+                     size=25,
+                     **_pos("thought", row))
+
+        net.add_edge(obs_id, thought_id,
+                     color='#90A4AE',  # Gray
+                     arrows='to')
+
+        if action:
+            action_id = f"Act_{sid}"
+            net.add_node(action_id,
+                         title=action,
+                         label="Action",
+                         color='#FFCC80',  # Light orange
+                         size=25,
+                         **_pos("action", row))
+            net.add_edge(thought_id, action_id,
+                         color='#90A4AE',
+                         arrows='to')
+
+            if result:
+                result_id = f"Result_{sid}"
+                net.add_node(result_id,
+                             title=result,
+                             label="Result",
+                             color='#EF9A9A',  # Light red
+                             size=25,
+                             **_pos("result", row))
+                net.add_edge(action_id, result_id,
+                             color='#90A4AE',
+                             arrows='to')
+
+    if static_layout:
+        net.set_options(_PYVIS_OPTIONS_STATIC)
+    else:
+        net.set_options(_PYVIS_OPTIONS_PHYSICS % max(30, 10 * len(steps)))
+
     return net
 
 # Streamlit UI Layout
 st.set_page_config(layout="wide", page_title="ProdAI")
 
+# Default the response slots up front so reruns do plain attribute reads
+# instead of hasattr/getattr probes
+st.session_state.setdefault("has_response", False)
+st.session_state.setdefault("response_data", None)
+st.session_state.setdefault("batch_results", None)
+
 st.title("🧠 ProdAI")
 
 # User Input Section
 with st.container():
     user_query = st.text_area("Enter your query:", height=100)
     if st.button("Analyze"):
-        if user_query.strip():
-            with st.spinner("Analyzing..."):
-                response_data = fetch_data_from_flask(user_query)
-                
-                if response_data and response_data.get("response"):
-                    st.session_state.response_data = response_data["response"]
-                    st.session_state.has_response = True
-                else:
-                    st.error("Failed to get response from backend.")
+        queries = [line.strip() for line in user_query.splitlines() if line.strip()]
+        if len(queries) > 1:
+            # Comparative batch: fan out over the pooled client so
+            # wall-clock is max(latency) instead of the sum
+            with st.spinner(f"Analyzing {len(queries)} queries..."):
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    responses = list(pool.map(fetch_data_from_flask, queries))
+            for query, error in store_batch_responses(queries, responses):
+                st.error(f"Query failed: {query[:60]} — {error}")
+        elif user_query.strip():
+            query_key = hashlib.blake2b(user_query.encode(), digest_size=16).hexdigest()
+            query_cache = st.session_state.setdefault("query_cache", OrderedDict())
+
+            if query_key in query_cache:
+                # Recently-seen query: zero-latency reuse from the session cache
+                query_cache.move_to_end(query_key)
+                store_response(query_cache[query_key])
+            else:
+                with st.status("Analyzing...", expanded=True) as status:
+                    response = stream_data_from_backend(user_query, status)
+
+                    if response:
+                        status.update(label="Analysis complete", state="complete", expanded=False)
+                        store_response(response)
+                        query_cache[query_key] = response
+                        if len(query_cache) > _QUERY_CACHE_SIZE:
+                            query_cache.popitem(last=False)
+                    else:
+                        status.update(label="Analysis failed", state="error")
+                        st.error("Failed to get response from backend.")
         else:
             st.warning("Please enter a query.")
 
 # Display Results
-if hasattr(st.session_state, 'has_response') and st.session_state.has_response:
+@st.fragment
+def render_results(response_data, raw_plan_str=None):
+    """Render the reasoning graph and plan panels.
+
+    As a fragment, widget changes elsewhere (e.g. the sidebar toggles)
+    rerun only this block's owner scope, not the graph build.
+    """
     col1, col2 = st.columns([1, 1])
-    
+
     with col1:
         st.subheader("📊 Reasoning Process")
-        
-        reasoning_data = st.session_state.response_data.get("reasoning_chain")
+
+        reasoning_data = response_data.get("reasoning_chain")
         if reasoning_data:
-            G = create_reasoning_graph(reasoning_data)
-            if G:
-                net = create_network_visualization(G)
-                
-                net.save_graph("reasoning_graph.html")
-                with open("reasoning_graph.html", "r", encoding="utf-8") as f:
-                    graph_html = f.read()
+            graph_html = build_graph_html(steps_cache_key(reasoning_data.get("steps", [])))
+            if graph_html:
                 st.components.v1.html(graph_html, height=600, scrolling=True)
-                
-                with st.expander("View Detailed Reasoning Steps"):
-                    for step in reasoning_data["steps"]:
-                        st.markdown(f"""
-                        **Observation:** {step['observation']}  
-                        **Thought:** {step['thought']}  
-                        **Action:** {step.get('action', 'N/A')}  
-                        **Result:** {step.get('result', 'N/A')}  
-                        ---  
-                        """)
+
+            # Rendered whether or not a graph was worth building, so
+            # trivial chains still show their steps
+            with st.expander("View Detailed Reasoning Steps", expanded=graph_html is None):
+                # One st.markdown call for all steps: one element over
+                # the Streamlit pipe instead of one per step
+                steps_blob = "\n\n---\n\n".join(
+                    f"**Observation:** {step['observation']}  \n"
+                    f"**Thought:** {step['thought']}  \n"
+                    f"**Action:** {step.get('action', 'N/A')}  \n"
+                    f"**Result:** {step.get('result', 'N/A')}"
+                    for step in reasoning_data["steps"]
+                )
+                st.markdown(steps_blob)
 
     with col2:
         st.subheader("📑 Final Plan")
-        
-        plan_markdown = st.session_state.response_data.get("plan_markdown")
+
+        plan_markdown = response_data.get("plan_markdown")
         if plan_markdown:
             st.markdown(plan_markdown)
-            
+
         with st.expander("📈 View Raw Plan Details"):
-            raw_plan = st.session_state.response_data.get("raw_plan")
-            if raw_plan:
-                st.json(raw_plan)
+            # Prebuilt orjson string; st.code skips Streamlit's JSON
+            # processor entirely
+            if raw_plan_str is None:
+                raw_plan_str = st.session_state.get("raw_plan_str")
+            if raw_plan_str:
+                st.code(raw_plan_str, language="json")
+
+batch_results = st.session_state.batch_results
+if batch_results:
+    for tab, result in zip(st.tabs([r["query"][:40] for r in batch_results]), batch_results):
+        with tab:
+            render_results(result["response"], result["raw_plan_str"])
+elif st.session_state.has_response:
+    render_results(st.session_state.response_data)
 
 # Sidebar
 with st.sidebar:
     st.subheader("📋 Session Information")
-    if hasattr(st.session_state, 'response_data'):
+    if st.session_state.response_data:
         st.info(f"Conversation ID: {st.session_state.response_data.get('conversation_id', 'N/A')}")
         st.info(f"Last Updated: {st.session_state.response_data.get('raw_plan', {}).get('timeline', 'N/A')}")
-    
+
     st.subheader("⚙️ Display Settings")
     if st.checkbox("Show Raw JSON", value=False):
-        st.json(getattr(st.session_state, 'response_data', {}))
+        st.json(st.session_state.response_data or {})